@@ -1,19 +1,31 @@
+import io
 import os
 import json
-import re
+import sqlite3
+import threading
 import time
+from concurrent.futures import ThreadPoolExecutor
 from datetime import date, datetime, timedelta, timezone
-from typing import Any, Dict, List, Optional
+from typing import Any, Callable, Collection, Dict, Iterable, List, Optional, Set, TypeVar
 import pandas as pd
 import yfinance as yf
 
 import requests
-from xml.etree import ElementTree as ET
+from requests_cache import CachedSession
+from requests.adapters import HTTPAdapter
+from lxml import etree
+from urllib3.util.retry import Retry
+
+try:
+    import orjson
+except ImportError:  # fall back to stdlib json
+    orjson = None
 
 # ----------------- config -----------------
 
-# Be polite to SEC (2 req/sec)
-REQUEST_DELAY_SEC = 0.5
+# Be polite to SEC: fair access policy allows 10 req/sec, we stay at 8
+REQUEST_DELAY_SEC = 0.125      # min spacing between request starts
+MAX_CONCURRENT_REQUESTS = 8    # worker threads issuing requests
 
 # Form 4 lookback
 FORM4_DAYS_BACK = 3        # last 3 calendar days
@@ -23,6 +35,16 @@ FORM4_MAX_FILINGS = 400    # safety cap
 SCHED13_DAYS_BACK = 30     # last 30 days to ensure some data
 SCHED13_MAX_FILINGS = 200
 
+# On-disk HTTP cache (SQLite). Published daily indexes and filings never
+# change, so repeat runs read them from disk instead of SEC. Nothing older
+# than the longest lookback is requested again, so entries expire after it
+# and are purged once per run to keep the file bounded.
+HTTP_CACHE_PATH = os.path.join("data", ".http_cache")
+HTTP_CACHE_EXPIRE_AFTER = timedelta(days=SCHED13_DAYS_BACK + 1)
+
+# Parsed Form 4 results, so filings seen in a previous run aren't refetched
+RESULTS_DB_PATH = os.path.join("data", "insider.sqlite")
+
 # IMPORTANT: put your real email here
 SEC_HEADERS = {
     "User-Agent": "Rachit Aggarwal (insider_deals; contact: rachitagg406@gmail.com)",
@@ -31,6 +53,67 @@ SEC_HEADERS = {
 }
 
 
+# ----------------- HTTP helpers -----------------
+
+T = TypeVar("T")
+R = TypeVar("R")
+
+# One pooled keep-alive, disk-cached session for all SEC calls, so we don't
+# pay a fresh TCP+TLS handshake per request (or any request on a cache hit).
+SESSION = CachedSession(
+    HTTP_CACHE_PATH,
+    backend="sqlite",
+    expire_after=HTTP_CACHE_EXPIRE_AFTER,
+    allowable_methods=["GET"],
+)
+SESSION.headers.update(SEC_HEADERS)
+SESSION.mount(
+    "https://",
+    HTTPAdapter(
+        pool_connections=4,
+        pool_maxsize=16,
+        max_retries=Retry(
+            total=3,
+            backoff_factor=0.3,
+            status_forcelist=[429, 500, 502, 503, 504],
+        ),
+    ),
+)
+
+_throttle_lock = threading.Lock()
+_next_request_at = 0.0
+
+
+def throttle() -> None:
+    """
+    Block until the caller may start a request. Request starts are spaced
+    REQUEST_DELAY_SEC apart across all worker threads.
+    """
+    global _next_request_at
+    with _throttle_lock:
+        now = time.monotonic()
+        start_at = max(now, _next_request_at)
+        _next_request_at = start_at + REQUEST_DELAY_SEC
+    if start_at > now:
+        time.sleep(start_at - now)
+
+
+def sec_get(url: str) -> requests.Response:
+    # Cached hits never reach SEC, so they don't count against the rate limit
+    if not SESSION.cache.contains(url=url):
+        throttle()
+    return SESSION.get(url, timeout=30)
+
+
+def map_concurrently(fn: Callable[[T], R], items: Iterable[T]) -> List[R]:
+    """
+    Run fn over items on a bounded thread pool, preserving input order.
+    The work is I/O-bound, so threads overlap the network round-trips.
+    """
+    with ThreadPoolExecutor(max_workers=MAX_CONCURRENT_REQUESTS) as pool:
+        return list(pool.map(fn, items))
+
+
 # ----------------- daily index helpers -----------------
 
 def quarter_for_month(m: int) -> int:
@@ -48,8 +131,7 @@ def fetch_daily_index(d: date) -> Optional[str]:
     url = f"https://www.sec.gov/Archives/edgar/daily-index/{year}/QTR{q}/master.{yyyymmdd}.idx"
 
     try:
-        resp = requests.get(url, headers=SEC_HEADERS, timeout=30)
-        time.sleep(REQUEST_DELAY_SEC)
+        resp = sec_get(url)
     except Exception as e:
         print(f"Error fetching index for {d}: {e}")
         return None
@@ -61,46 +143,62 @@ def fetch_daily_index(d: date) -> Optional[str]:
     return resp.text
 
 
-def iter_daily_indexes(days_back: int):
+def fetch_daily_indexes(today: date, days_back: int) -> Dict[date, Optional[str]]:
+    """
+    Fetch the daily indexes for the `days_back` days up to `today` concurrently.
+    Returns {date: index_text or None} covering every day in that window,
+    with None for days that have no index.
+
+    Collectors share the result, so overlapping day windows are only
+    fetched once per run.
+    """
+    days = [today - timedelta(days=i) for i in range(days_back)]
+    return dict(zip(days, map_concurrently(fetch_daily_index, days)))
+
+
+def iter_daily_indexes(indexes: Dict[date, Optional[str]], days_back: int):
     """
     Yield {"date": date, "text": index_text} for the last `days_back` days
-    where an index exists.
+    of `indexes` (as returned by fetch_daily_indexes) where an index exists.
     """
-    today = date.today()
+    if not indexes:
+        return
+    # fetch_daily_indexes covers every day up to `today`, so max() is today
+    today = max(indexes)
     for i in range(days_back):
         d = today - timedelta(days=i)
-        text = fetch_daily_index(d)
+        text = indexes.get(d)
         if text:
             yield {"date": d, "text": text}
 
 
-def parse_idx_for_forms(text: str, predicate) -> List[Dict[str, Any]]:
+def parse_idx_for_forms(text: str, forms: Collection[str]) -> List[Dict[str, Any]]:
     """
-    Parse a master.idx text and return filings where predicate(form_type) is True.
+    Parse a master.idx text and return filings whose form type is in `forms`.
+    Form types in master.idx are already canonical upper case, so `forms`
+    is matched exactly (no per-line .upper()).
     """
-    lines = text.splitlines()
-    start_idx = None
-
-    for i, line in enumerate(lines):
-        if line.startswith("CIK|Company Name|Form Type|Date Filed|File Name"):
-            start_idx = i + 1
-            break
-
-    if start_idx is None:
+    header = text.find("CIK|Company Name|Form Type|Date Filed|File Name")
+    if header == -1:
         return []
+    body_start = text.find("\n", header) + 1
+
+    # Substring shared by every wanted "|<form>|" field ("|4" for 4 and 4/A).
+    # Most lines lack it and are dropped without being split.
+    marker = os.path.commonprefix([f"|{ft}|" for ft in forms])
 
     filings: List[Dict[str, Any]] = []
 
-    for line in lines[start_idx:]:
-        if not line.strip():
+    for line in text[body_start:].splitlines():
+        if marker not in line:
             continue
-        parts = line.split("|")
+        parts = line.split("|", 4)
         if len(parts) < 5:
             continue
 
-        cik, company, form, date_filed, file_name = parts[:5]
+        cik, company, form, date_filed, file_name = parts
         form = form.strip()
-        if not predicate(form):
+        if form not in forms:
             continue
 
         fd_raw = date_filed.strip()
@@ -129,50 +227,46 @@ def parse_idx_for_forms(text: str, predicate) -> List[Dict[str, Any]]:
 
 # ----------------- Form 4 XML helpers -----------------
 
-def extract_ownership_xml_from_txt(text: str) -> Optional[str]:
-    """
-    Extract the <ownershipDocument>...</ownershipDocument> XML block
-    from inside a .txt Form 4 filing.
-
-    Many Form 4 .txt filings embed the XML like:
-      <XML>
-        <?xml version="1.0"?>
-        <ownershipDocument>...</ownershipDocument>
-      </XML>
-    """
-    m = re.search(
-        r"<ownershipDocument[\s\S]*?</ownershipDocument>",
-        text,
-        flags=re.IGNORECASE,
-    )
-    if not m:
+# Paths compiled once; relative to <ownershipDocument> unless noted.
+_XP_ISSUER_NAME = etree.XPath("issuer/issuerName/text()")
+_XP_ISSUER_CIK = etree.XPath("issuer/issuerCik/text()")
+_XP_ISSUER_SYMBOL = etree.XPath("issuer/issuerTradingSymbol/text()")
+_XP_OWNER_NAME = etree.XPath("reportingOwner[1]/reportingOwnerId/rptOwnerName/text()")
+_XP_OWNER_CIK = etree.XPath("reportingOwner[1]/reportingOwnerId/rptOwnerCik/text()")
+_XP_OWNER_IS_DIRECTOR = etree.XPath(
+    "reportingOwner[1]/reportingOwnerRelationship/isDirector/text()"
+)
+_XP_OWNER_IS_OFFICER = etree.XPath(
+    "reportingOwner[1]/reportingOwnerRelationship/isOfficer/text()"
+)
+_XP_OWNER_IS_TEN_PERCENT = etree.XPath(
+    "reportingOwner[1]/reportingOwnerRelationship/isTenPercentOwner/text()"
+)
+_XP_OWNER_OFFICER_TITLE = etree.XPath(
+    "reportingOwner[1]/reportingOwnerRelationship/officerTitle/text()"
+)
+_XP_NON_DERIV_TXNS = etree.XPath("nonDerivativeTable/nonDerivativeTransaction")
+
+# Relative to <nonDerivativeTransaction>: every <value> leaf in one call
+# (securityTitle/value, transactionAmounts/transactionShares/value, ...),
+# keyed afterwards by the parent tag, which is unique within a transaction.
+_XP_TX_VALUES = etree.XPath("*/value | */*/value")
+_XP_TX_CODE = etree.XPath("transactionCoding/transactionCode/text()")
+
+
+_XML_TRUE = ("1", "true", "True")
+
+
+def _text_or_none(xpath: etree.XPath, node: etree._Element) -> Optional[str]:
+    found = xpath(node)
+    if not found:
         return None
-
-    xml_body = m.group(0)
-
-    # Look for XML declaration immediately before the ownershipDocument
-    prefix = text[: m.start()]
-    decl = re.search(r"<\?xml[^>]*\?>", prefix)
-    if decl:
-        return decl.group(0) + "\n" + xml_body
-
-    # Otherwise, add a basic declaration
-    return '<?xml version="1.0" encoding="UTF-8"?>\n' + xml_body
-
-
-def _text_or_none(parent: Optional[ET.Element], path: str) -> Optional[str]:
-    if parent is None:
-        return None
-    el = parent.find(path)
-    if el is None or el.text is None:
-        return None
-    return el.text.strip()
+    return found[0].strip()
 
 
 def _to_float(s: Optional[str]) -> Optional[float]:
-    if s is None:
-        return None
-    s = s.replace(",", "").strip()
+    # Form 4 XML numbers are schema-validated xs:decimal values (no thousands
+    # separators) and float() ignores surrounding whitespace, so no cleanup.
     if not s:
         return None
     try:
@@ -181,149 +275,281 @@ def _to_float(s: Optional[str]) -> Optional[float]:
         return None
 
 
-def parse_form4_xml_transactions(xml_text: str) -> List[Dict[str, Any]]:
+def parse_form4_xml_transactions(root: etree._Element) -> List[Dict[str, Any]]:
     """
-    Parse a Form 4 ownershipDocument XML into a list of flat transaction rows.
+    Parse a Form 4 <ownershipDocument> element into a list of flat transaction rows.
     Only Table I (non-derivative) is handled here.
     """
-    root = ET.fromstring(xml_text)
+    if root.find("reportingOwner") is None:
+        return []
 
-    issuer = root.find("issuer")
-    issuer_name = _text_or_none(issuer, "issuerName")
-    issuer_cik = _text_or_none(issuer, "issuerCik")
-    issuer_trading_symbol = _text_or_none(issuer, "issuerTradingSymbol")
+    # Issuer + first reporting owner fields are shared by every row of the
+    # filing: build them once and copy the template per transaction.
+    base = {
+        "issuer_cik": _text_or_none(_XP_ISSUER_CIK, root),
+        "issuer_name": _text_or_none(_XP_ISSUER_NAME, root),
+        "issuer_trading_symbol": _text_or_none(_XP_ISSUER_SYMBOL, root),
+        "owner_cik": _text_or_none(_XP_OWNER_CIK, root),
+        "owner_name": _text_or_none(_XP_OWNER_NAME, root),
+        "owner_is_director": _text_or_none(_XP_OWNER_IS_DIRECTOR, root) in _XML_TRUE,
+        "owner_is_officer": _text_or_none(_XP_OWNER_IS_OFFICER, root) in _XML_TRUE,
+        "owner_is_ten_percent": _text_or_none(_XP_OWNER_IS_TEN_PERCENT, root) in _XML_TRUE,
+        "owner_officer_title": _text_or_none(_XP_OWNER_OFFICER_TITLE, root),
+    }
 
-    reporting_owners = root.findall("reportingOwner")
-    if not reporting_owners:
-        return []
+    rows: List[Dict[str, Any]] = []
 
-    # Use first reporting owner
-    ro = reporting_owners[0]
-    ro_id = ro.find("reportingOwnerId")
-    ro_rel = ro.find("reportingOwnerRelationship")
+    for txn in _XP_NON_DERIV_TXNS(root):
+        row = base.copy()
+        values = {
+            v.getparent().tag: v.text.strip() if v.text is not None else None
+            for v in _XP_TX_VALUES(txn)
+        }
+        row["security_title"] = values.get("securityTitle")
+        row["transaction_date"] = values.get("transactionDate")
+        row["transaction_code"] = _text_or_none(_XP_TX_CODE, txn)
+        row["transaction_shares"] = _to_float(values.get("transactionShares"))
+        row["transaction_price"] = _to_float(values.get("transactionPricePerShare"))
+        row["shares_owned_after"] = _to_float(values.get("sharesOwnedFollowingTransaction"))
+        row["direct_or_indirect_ownership"] = values.get("directOrIndirectOwnership")
+        rows.append(row)
 
-    owner_name = _text_or_none(ro_id, "rptOwnerName")
-    owner_cik = _text_or_none(ro_id, "rptOwnerCik")
-    is_director = _text_or_none(ro_rel, "isDirector") in ("1", "true", "True")
-    is_officer = _text_or_none(ro_rel, "isOfficer") in ("1", "true", "True")
-    is_ten_percent = _text_or_none(ro_rel, "isTenPercentOwner") in ("1", "true", "True")
-    officer_title = _text_or_none(ro_rel, "officerTitle")
+    return rows
 
-    non_deriv_table = root.find("nonDerivativeTable")
-    if non_deriv_table is None:
-        return []
 
-    rows: List[Dict[str, Any]] = []
+def parse_form4_txt(data: bytes) -> Optional[List[Dict[str, Any]]]:
+    """
+    Parse a Form 4 .txt submission straight into transaction rows,
+    or return None if no <ownershipDocument> is embedded.
 
-    for txn in non_deriv_table.findall("nonDerivativeTransaction"):
-        security_title = _text_or_none(txn, "securityTitle/value")
-        transaction_date = _text_or_none(txn, "transactionDate/value")
-        transaction_code = _text_or_none(txn.find("transactionCoding"), "transactionCode")
+    Many Form 4 .txt filings embed the XML like:
+      <XML>
+        <?xml version="1.0"?>
+        <ownershipDocument>...</ownershipDocument>
+      </XML>
 
-        amounts = txn.find("transactionAmounts")
-        txn_shares = _to_float(_text_or_none(amounts, "transactionShares/value"))
-        txn_price = _to_float(_text_or_none(amounts, "transactionPricePerShare/value"))
+    We seek to the XML declaration / ownershipDocument start and stream-parse
+    from there, stopping at the first </ownershipDocument>, so the SGML
+    wrapper around it is never fed to libxml2. Malformed or truncated XML
+    raises, so the filing is skipped and retried rather than stored garbled.
+    """
+    doc_start = data.find(b"<ownershipDocument")
+    if doc_start == -1:
+        return None
+    decl_start = data.rfind(b"<?xml", 0, doc_start)
+
+    stream = io.BytesIO(data)
+    stream.seek(decl_start if decl_start != -1 else doc_start)
+
+    events = etree.iterparse(
+        stream,
+        events=("end",),
+        tag="ownershipDocument",
+        huge_tree=True,
+        resolve_entities=False,
+        no_network=True,
+    )
+    for _, doc in events:
+        rows = parse_form4_xml_transactions(doc)
+        doc.clear(keep_tail=False)
+        return rows
+    return None
+
+
+# ----------------- Form 4 result store -----------------
+
+# Bump whenever parsing or the row layout changes: a store written by another
+# version is dropped and rebuilt, so stored filings get reparsed.
+FORM4_STORE_VERSION = 1
+
+FORM4_TX_COLUMNS = (
+    "issuer_cik",
+    "issuer_name",
+    "issuer_trading_symbol",
+    "owner_cik",
+    "owner_name",
+    "owner_is_director",
+    "owner_is_officer",
+    "owner_is_ten_percent",
+    "owner_officer_title",
+    "security_title",
+    "transaction_date",
+    "transaction_code",
+    "transaction_shares",
+    "transaction_price",
+    "shares_owned_after",
+    "direct_or_indirect_ownership",
+    "filing_url",
+    "filed_date",
+    "form_type",
+)
+_FORM4_BOOL_COLUMNS = ("owner_is_director", "owner_is_officer", "owner_is_ten_percent")
+
+
+def open_result_store(path: str) -> sqlite3.Connection:
+    """
+    Open (creating if needed) the SQLite store of parsed Form 4 filings.
 
-        post_amounts = txn.find("postTransactionAmounts")
-        shares_after = _to_float(
-            _text_or_none(post_amounts, "sharesOwnedFollowingTransaction/value")
-        )
+    form4_filings records every filing we have processed, including ones
+    with no transactions; form4_tx holds the flattened rows, in filing order.
+    The store is rebuilt if it was written under another FORM4_STORE_VERSION.
+    """
+    os.makedirs(os.path.dirname(path), exist_ok=True)
+    conn = sqlite3.connect(path)
+    (version,) = conn.execute("PRAGMA user_version").fetchone()
+    if version != FORM4_STORE_VERSION:
+        with conn:
+            conn.execute("DROP TABLE IF EXISTS form4_tx")
+            conn.execute("DROP TABLE IF EXISTS form4_filings")
+            conn.execute(f"PRAGMA user_version = {FORM4_STORE_VERSION}")
+    conn.execute(
+        "CREATE TABLE IF NOT EXISTS form4_filings ("
+        "filing_url TEXT PRIMARY KEY, filed_date TEXT NOT NULL)"
+    )
+    conn.execute(
+        "CREATE TABLE IF NOT EXISTS form4_tx ("
+        f"seq INTEGER NOT NULL, {', '.join(FORM4_TX_COLUMNS)}, "
+        "PRIMARY KEY (filing_url, seq))"
+    )
+    return conn
 
-        ownership_nature = txn.find("ownershipNature")
-        direct_or_indirect = _text_or_none(ownership_nature, "directOrIndirectOwnership")
 
-        rows.append(
-            {
-                "issuer_cik": issuer_cik,
-                "issuer_name": issuer_name,
-                "issuer_trading_symbol": issuer_trading_symbol,
-                "owner_cik": owner_cik,
-                "owner_name": owner_name,
-                "owner_is_director": is_director,
-                "owner_is_officer": is_officer,
-                "owner_is_ten_percent": is_ten_percent,
-                "owner_officer_title": officer_title,
-                "security_title": security_title,
-                "transaction_date": transaction_date,
-                "transaction_code": transaction_code,
-                "transaction_shares": txn_shares,
-                "transaction_price": txn_price,
-                "shares_owned_after": shares_after,
-                "direct_or_indirect_ownership": direct_or_indirect,
-            }
+def stored_form4_filings(conn: sqlite3.Connection) -> Set[str]:
+    return {url for (url,) in conn.execute("SELECT filing_url FROM form4_filings")}
+
+
+def store_form4_filing(
+    conn: sqlite3.Connection, filing: Dict[str, Any], txs: List[Dict[str, Any]]
+) -> None:
+    placeholders = ", ".join("?" for _ in range(len(FORM4_TX_COLUMNS) + 1))
+    with conn:
+        conn.execute(
+            "INSERT OR IGNORE INTO form4_filings (filing_url, filed_date) VALUES (?, ?)",
+            (filing["filing_url"], filing["filed_date"]),
+        )
+        conn.executemany(
+            f"INSERT OR IGNORE INTO form4_tx (seq, {', '.join(FORM4_TX_COLUMNS)}) "
+            f"VALUES ({placeholders})",
+            [(i, *(row[c] for c in FORM4_TX_COLUMNS)) for i, row in enumerate(txs)],
         )
 
+
+def prune_form4_store(conn: sqlite3.Connection, oldest_filed_date: str) -> None:
+    """Drop filings older than the current lookback window."""
+    with conn:
+        conn.execute("DELETE FROM form4_tx WHERE filed_date < ?", (oldest_filed_date,))
+        conn.execute("DELETE FROM form4_filings WHERE filed_date < ?", (oldest_filed_date,))
+
+
+def load_form4_rows(conn: sqlite3.Connection, filing_urls: List[str]) -> List[Dict[str, Any]]:
+    """
+    Load stored transaction rows for `filing_urls`, in that order.
+    """
+    by_filing: Dict[str, List[Dict[str, Any]]] = {}
+    cur = conn.execute(
+        f"SELECT {', '.join(FORM4_TX_COLUMNS)} FROM form4_tx ORDER BY filing_url, seq"
+    )
+    for values in cur:
+        row = dict(zip(FORM4_TX_COLUMNS, values))
+        for c in _FORM4_BOOL_COLUMNS:
+            row[c] = bool(row[c])
+        by_filing.setdefault(row["filing_url"], []).append(row)
+
+    rows: List[Dict[str, Any]] = []
+    for url in filing_urls:
+        rows.extend(by_filing.get(url, []))
     return rows
 
 
 # ----------------- Form 4 collector -----------------
 
-def collect_recent_form4_filings(days_back: int, max_filings: int) -> List[Dict[str, Any]]:
+FORM4_FORMS = frozenset({"4", "4/A"})
+
+
+def collect_recent_form4_filings(
+    indexes: Dict[date, Optional[str]], days_back: int, max_filings: int
+) -> List[Dict[str, Any]]:
     """
     Use daily master index for the last N days and return a list of Form 4 filings.
     """
     filings: List[Dict[str, Any]] = []
 
-    def is_form4(ft: str) -> bool:
-        ft = ft.upper()
-        return ft in ("4", "4/A")
-
-    for d in iter_daily_indexes(days_back):
-        day_filings = parse_idx_for_forms(d["text"], is_form4)
+    for d in iter_daily_indexes(indexes, days_back):
+        day_filings = parse_idx_for_forms(d["text"], FORM4_FORMS)
         filings.extend(day_filings)
 
     filings.sort(key=lambda f: (f["raw_filed_date"], f["file_name"]), reverse=True)
     return filings[:max_filings]
 
 
-def collect_form4_transactions(days_back: int, max_filings: int) -> List[Dict[str, Any]]:
+def fetch_form4_rows(f: Dict[str, Any]) -> Optional[List[Dict[str, Any]]]:
     """
-    Fetch recent Form 4s and flatten into transaction rows.
+    Fetch a single Form 4 .txt filing and flatten it into transaction rows.
+    Returns None if the filing couldn't be fetched or parsed (worth retrying
+    next run), or a possibly empty list of rows otherwise.
     """
-    filings = collect_recent_form4_filings(days_back, max_filings)
-    print(f"Found {len(filings)} Form 4 filings in the last {days_back} days.")
+    filing_url = f["filing_url"]
+    filed_date = f["filed_date"]
+    form_type = f["form_type"]
+
+    try:
+        resp = sec_get(filing_url)
+    except Exception as e:
+        print(f"Error fetching Form 4 txt {filing_url}: {e}")
+        return None
+
+    if resp.status_code != 200:
+        print(f"Form 4 txt fetch failed ({resp.status_code}) for {filing_url}")
+        return None
 
-    all_rows: List[Dict[str, Any]] = []
+    try:
+        txs = parse_form4_txt(resp.content)
+    except Exception as e:
+        print(f"Error parsing ownership XML for {filing_url}: {e}")
+        return None
 
-    for f in filings:
-        filing_url = f["filing_url"]
-        filed_date = f["filed_date"]
-        form_type = f["form_type"]
+    if txs is None:
+        print(f"No ownershipDocument XML found inside {filing_url}")
+        return []
 
-        try:
-            resp = requests.get(filing_url, headers=SEC_HEADERS, timeout=30)
-            time.sleep(REQUEST_DELAY_SEC)
-        except Exception as e:
-            print(f"Error fetching Form 4 txt {filing_url}: {e}")
-            continue
+    if not txs:
+        print(f"No non-derivative transactions parsed for {filing_url}")
+        return []
 
-        if resp.status_code != 200:
-            print(f"Form 4 txt fetch failed ({resp.status_code}) for {filing_url}")
-            continue
+    for row in txs:
+        row["filing_url"] = filing_url
+        row["filed_date"] = filed_date
+        row["form_type"] = form_type
 
-        txt = resp.text
-        xml_text = extract_ownership_xml_from_txt(txt)
-        if not xml_text:
-            print(f"No ownershipDocument XML found inside {filing_url}")
-            continue
+    return txs
 
-        try:
-            txs = parse_form4_xml_transactions(xml_text)
-        except Exception as e:
-            print(f"Error parsing ownership XML for {filing_url}: {e}")
-            continue
 
-        if not txs:
-            print(f"No non-derivative transactions parsed for {filing_url}")
-            continue
+def collect_form4_transactions(
+    conn: sqlite3.Connection,
+    indexes: Dict[date, Optional[str]],
+    days_back: int,
+    max_filings: int,
+) -> List[Dict[str, Any]]:
+    """
+    Fetch recent Form 4s and flatten into transaction rows.
+    Filings already in the result store are read from it instead of SEC.
+    """
+    filings = collect_recent_form4_filings(indexes, days_back, max_filings)
+    seen = stored_form4_filings(conn)
+    new_filings = [f for f in filings if f["filing_url"] not in seen]
+    print(
+        f"Found {len(filings)} Form 4 filings in the last {days_back} days "
+        f"({len(new_filings)} new)."
+    )
 
-        for row in txs:
-            row["filing_url"] = filing_url
-            row["filed_date"] = filed_date
-            row["form_type"] = form_type
+    for f, txs in zip(new_filings, map_concurrently(fetch_form4_rows, new_filings)):
+        if txs is not None:
+            store_form4_filing(conn, f, txs)
 
-        all_rows.extend(txs)
+    if filings:
+        prune_form4_store(conn, min(f["filed_date"] for f in filings))
 
+    all_rows = load_form4_rows(conn, [f["filing_url"] for f in filings])
     all_rows.sort(
         key=lambda r: (
             r.get("transaction_date") or "",
@@ -334,7 +560,7 @@ def collect_form4_transactions(days_back: int, max_filings: int) -> List[Dict[st
     return all_rows
 
 
-def enrich_with_price_metrics(form4_rows: List[Dict[str, Any]]) -> None:
+def enrich_with_price_metrics(form4_rows: List[Dict[str, Any]], today: date) -> None:
     """
     For each Form 4 row (buy/sell), attach:
       - ret_1m, ret_3m, ret_1y  : forward total returns from transaction date
@@ -354,7 +580,7 @@ def enrich_with_price_metrics(form4_rows: List[Dict[str, Any]]) -> None:
     if not by_symbol:
         return
 
-    end = date.today() + timedelta(days=1)
+    end = today + timedelta(days=1)
     start = end - timedelta(days=400)  # ~ >1 year of data
 
     for sym, rows in by_symbol.items():
@@ -423,26 +649,25 @@ def enrich_with_price_metrics(form4_rows: List[Dict[str, Any]]) -> None:
 
 # ----------------- Schedule 13D/13G collector -----------------
 
-SCHED13_FORMS = {
+SCHED13_FORMS = frozenset({
     "SC 13D",
     "SC 13D/A",
     "SC 13G",
     "SC 13G/A",
-}
+})
 
 
-def collect_recent_sched13_filings(days_back: int, max_filings: int) -> List[Dict[str, Any]]:
+def collect_recent_sched13_filings(
+    indexes: Dict[date, Optional[str]], days_back: int, max_filings: int
+) -> List[Dict[str, Any]]:
     """
     Use daily master index to collect recent Schedule 13D/13G filings.
     We keep it filing-level (no deep XML parsing) for now.
     """
     filings: List[Dict[str, Any]] = []
 
-    def is_sched13(ft: str) -> bool:
-        return ft.upper() in SCHED13_FORMS
-
-    for d in iter_daily_indexes(days_back):
-        day_filings = parse_idx_for_forms(d["text"], is_sched13)
+    for d in iter_daily_indexes(indexes, days_back):
+        day_filings = parse_idx_for_forms(d["text"], SCHED13_FORMS)
         filings.extend(day_filings)
 
     filings.sort(key=lambda f: (f["raw_filed_date"], f["file_name"]), reverse=True)
@@ -453,27 +678,50 @@ def collect_recent_sched13_filings(days_back: int, max_filings: int) -> List[Dic
 
 def write_json(path: str, payload: Dict[str, Any]) -> None:
     os.makedirs(os.path.dirname(path), exist_ok=True)
-    with open(path, "w", encoding="utf-8") as f:
-        json.dump(payload, f, ensure_ascii=False, indent=2)
+    if orjson is not None:
+        # orjson emits UTF-8 bytes (same output as ensure_ascii=False)
+        with open(path, "wb") as f:
+            f.write(orjson.dumps(payload, option=orjson.OPT_INDENT_2))
+    else:
+        with open(path, "w", encoding="utf-8") as f:
+            json.dump(payload, f, ensure_ascii=False, indent=2)
     print(f"Wrote {len(payload.get('rows', []))} rows to {path}")
 
 
 def now_utc_iso() -> str:
-    return datetime.now(timezone.utc).replace(microsecond=0).isoformat().replace("+00:00", "Z")
+    return datetime.now(timezone.utc).strftime("%Y-%m-%dT%H:%M:%SZ")
 
 
 # ----------------- main -----------------
 
 def main() -> None:
+    # One clock reading per run, shared by every step and both payloads
+    today = date.today()
+    run_ts = now_utc_iso()
+
+    # Drop cached responses that have aged out of every lookback window
+    SESSION.cache.delete(expired=True)
+
+    # Daily indexes for both collectors, fetched once up front
+    index_days = max(FORM4_DAYS_BACK, SCHED13_DAYS_BACK)
+    print(f"Fetching daily indexes for the last {index_days} days...")
+    indexes = fetch_daily_indexes(today, index_days)
+
     # Form 4
     print("Collecting Form 4 transactions...")
-    form4_rows = collect_form4_transactions(FORM4_DAYS_BACK, FORM4_MAX_FILINGS)
+    conn = open_result_store(RESULTS_DB_PATH)
+    try:
+        form4_rows = collect_form4_transactions(
+            conn, indexes, FORM4_DAYS_BACK, FORM4_MAX_FILINGS
+        )
+    finally:
+        conn.close()
 
     print("Enriching Form 4 rows with price metrics...")
-    enrich_with_price_metrics(form4_rows)
+    enrich_with_price_metrics(form4_rows, today)
 
     form4_payload = {
-    "last_updated_utc": now_utc_iso(),
+    "last_updated_utc": run_ts,
     "source": "SEC EDGAR (Form 4 XML + daily index + Yahoo Finance)",
     "rows": form4_rows,
 }
@@ -482,9 +730,11 @@ def main() -> None:
 
     # Schedule 13D/13G
     print("Collecting Schedule 13D/13G filings...")
-    sched13_rows = collect_recent_sched13_filings(SCHED13_DAYS_BACK, SCHED13_MAX_FILINGS)
+    sched13_rows = collect_recent_sched13_filings(
+        indexes, SCHED13_DAYS_BACK, SCHED13_MAX_FILINGS
+    )
     sched13_payload = {
-        "last_updated_utc": now_utc_iso(),
+        "last_updated_utc": run_ts,
         "source": "SEC EDGAR (Schedule 13D/13G + daily index)",
         "rows": sched13_rows,
     }